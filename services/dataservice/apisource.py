@@ -1,7 +1,8 @@
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
-import requests
+from datastore import data_store
 
 
 class DataHandler:
@@ -12,47 +13,75 @@ class DataHandler:
         Args:
             target_column (str): euro95_1 / diesel_2 / lpg_3
         """
-        self.url = "https://opendata.cbs.nl/ODataApi/odata/80416ENG/TypedDataSet"
         self.target_column = target_column
         self.cap = None
         self.floor = None
 
     def get_full(self) -> pd.DataFrame:
-
-        data = requests.get(self.url)
-
-        data = data.json()["value"]
-        df = pd.DataFrame().from_dict(data)
-        df = self._prepare_dataframe(df)
-        latest_date = df.ds.max()
+        handler = MultiTargetDataHandler([self.target_column])
+        df, latest_date = handler.get_full()[self.target_column]
+        self.cap = handler.caps[self.target_column]
+        self.floor = handler.floors[self.target_column]
         return df, latest_date
 
     def get_latest(self) -> pd.DataFrame:
-        data = requests.get(self.url)
-        data = data.json()["value"]
-        df = pd.DataFrame().from_dict(data)
+        today = datetime.now().strftime("%Y%m%d")
+        column = self.target_column.lower()
+        df = data_store.read([column], period=today)
         df = self._prepare_dataframe(df)
 
-        today = datetime.now().strftime("%Y%m%d")
-        filtered_df = df[df["ds"] == today]
+        # cap and floor still describe the full history, not just today
+        self.floor, self.cap = data_store.bounds(column)
+        df["cap"] = self.cap
+        df["floor"] = self.floor
 
-        return filtered_df
+        return df
 
     def _prepare_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         df.columns = [col.lower() for col in df.columns]
-        df = df.rename(columns={"periods": "ds", f"{self.target_column}": "y"})
+        df = df.rename(columns={"periods": "ds", self.target_column.lower(): "y"})
 
-        for i in df.columns:
-            if i == "y" or i == "ds":
-                pass
-            else:
-                df = df.drop(i, axis=1)
-                print(i)
+        return df[["ds", "y"]]
 
-        self.cap = df["y"].max()
-        self.floor = df["y"].min()
 
-        df["cap"] = self.cap
-        df["floor"] = self.floor
+class MultiTargetDataHandler:
+    """Prepares several targets from a single read of the data store"""
 
-        return df
+    def __init__(self, target_columns: list) -> None:
+        """
+        Args:
+            target_columns (list): any of euro95_1 / diesel_2 / lpg_3
+        """
+        self.target_columns = target_columns
+        self.caps = {}
+        self.floors = {}
+
+    def get_full(self) -> dict:
+        """Returns {target: (df, latest_date)}, every df sharing the same arrays"""
+        columns = [target.lower() for target in self.target_columns]
+        df = data_store.read(columns)
+
+        ds = df["periods"].to_numpy()
+        values = df[columns].to_numpy(dtype=np.float64)
+        caps = np.nanmax(values, axis=0)
+        floors = np.nanmin(values, axis=0)
+        latest_date = ds.max()
+
+        frames = {}
+        for i, target in enumerate(self.target_columns):
+            self.caps[target] = caps[i]
+            self.floors[target] = floors[i]
+            frames[target] = (
+                pd.DataFrame(
+                    {
+                        "ds": ds,
+                        "y": values[:, i],
+                        "cap": np.full(ds.shape[0], caps[i]),
+                        "floor": np.full(ds.shape[0], floors[i]),
+                    },
+                    copy=False,
+                ),
+                latest_date,
+            )
+
+        return frames
@@ -0,0 +1,160 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+import pandas as pd
+import requests
+
+logger = logging.getLogger(__name__)
+
+class DataStore:
+    """Local sqlite copy of the CBS dataset, refreshed incrementally"""
+
+    def __init__(
+        self,
+        db_path: str,
+        url: str,
+        refresh_interval: int = 900,
+        page_size: int = 10000,
+        timeout: float = 30,
+        retry_backoff: float = 60,
+    ) -> None:
+        """
+        Args:
+            db_path (str): sqlite file holding the dataset
+            url (str): OData TypedDataSet endpoint
+            refresh_interval (int): seconds before the source is checked again
+            page_size (int): rows requested per OData page
+            timeout (float): seconds a CBS request may take
+            retry_backoff (float): seconds before retrying a failed refresh,
+                doubled per consecutive failure up to refresh_interval
+        """
+        self.db_path = db_path
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.page_size = page_size
+        self.timeout = timeout
+        self.retry_backoff = retry_backoff
+        self.table = "typed_dataset"
+        self._next_refresh = None
+        self._failures = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+    def refresh_if_stale(self) -> None:
+        """Pulls new periods from CBS when due
+
+        While a local copy exists, a failing source only gets logged and the
+        stored table keeps being served, and requests never wait for another
+        thread's refresh. Only an empty store raises.
+        """
+        if not self._refresh_due():
+            return
+        has_data = self._last_period() is not None
+        if not self._lock.acquire(blocking=not has_data):
+            return
+        try:
+            if not self._refresh_due():
+                return
+            try:
+                self._refresh()
+            except Exception as e:
+                self._failures += 1
+                backoff = min(
+                    self.retry_backoff * 2 ** (self._failures - 1),
+                    self.refresh_interval,
+                )
+                self._next_refresh = time.monotonic() + backoff
+                if self._last_period() is None:
+                    raise
+                logger.warning(
+                    f"CBS refresh failed, serving stored data and retrying "
+                    f"in {backoff}s: {e}"
+                )
+                return
+            self._failures = 0
+            self._next_refresh = time.monotonic() + self.refresh_interval
+        finally:
+            self._lock.release()
+
+    def _refresh_due(self) -> bool:
+        return self._next_refresh is None or time.monotonic() >= self._next_refresh
+
+    def read(self, columns: list, period: Optional[str] = None) -> pd.DataFrame:
+        """Reads periods plus the given columns, optionally for one period only"""
+        self.refresh_if_stale()
+        self._check_columns(columns)
+        selected = ", ".join(["periods"] + [f'"{col}"' for col in columns])
+        query = f"SELECT {selected} FROM {self.table}"
+        params = ()
+        if period is not None:
+            query += " WHERE periods = ?"
+            params = (period,)
+        query += " ORDER BY periods"
+
+        with sqlite3.connect(self.db_path) as conn:
+            return pd.read_sql_query(query, conn, params=params)
+
+    def bounds(self, column: str) -> tuple:
+        """Returns (min, max) of a column over the full history"""
+        self.refresh_if_stale()
+        self._check_columns([column])
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute(
+                f'SELECT MIN("{column}"), MAX("{column}") FROM {self.table}'
+            ).fetchone()
+
+    def _check_columns(self, columns: list) -> None:
+        with sqlite3.connect(self.db_path) as conn:
+            known = {
+                row[1] for row in conn.execute(f"PRAGMA table_info({self.table})")
+            }
+        unknown = [col for col in columns if col not in known]
+        if unknown:
+            raise ValueError(f"Unknown target column(s): {', '.join(unknown)}")
+
+    def _refresh(self) -> None:
+        last_period = self._last_period()
+        odata_filter = f"Periods gt '{last_period}'" if last_period else None
+
+        skip = 0
+        while True:
+            page = self._fetch_page(odata_filter, skip)
+            if page.empty:
+                break
+
+            page.columns = [col.lower() for col in page.columns]
+            with sqlite3.connect(self.db_path) as conn:
+                page.to_sql(self.table, conn, if_exists="append", index=False)
+
+            if len(page) < self.page_size:
+                break
+            skip += self.page_size
+
+    def _fetch_page(self, odata_filter: Optional[str], skip: int) -> pd.DataFrame:
+        params = {"$top": self.page_size, "$skip": skip, "$orderby": "Periods"}
+        if odata_filter is not None:
+            params["$filter"] = odata_filter
+
+        response = requests.get(self.url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return pd.DataFrame().from_dict(response.json()["value"])
+
+    def _last_period(self) -> Optional[str]:
+        with sqlite3.connect(self.db_path) as conn:
+            exists = conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name = ?",
+                (self.table,),
+            ).fetchone()
+            if exists is None:
+                return None
+            return conn.execute(f"SELECT MAX(periods) FROM {self.table}").fetchone()[0]
+
+
+data_store = DataStore(
+    db_path="data/cbs.sqlite",
+    url="https://opendata.cbs.nl/ODataApi/odata/80416ENG/TypedDataSet",
+)
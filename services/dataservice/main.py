@@ -1,7 +1,10 @@
 import logging
+
+import pandas as pd
 from flask import Flask, jsonify, request
 from register import ServiceRegistrationHandler
-from apisource import DataHandler
+from apisource import DataHandler, MultiTargetDataHandler
+from wireformat import parquet_response, wants_parquet
 
 logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO
@@ -21,7 +24,10 @@ def getFullData(target):
         logger.info(f"Received full data request for: {target}")
         data_handler = DataHandler(target)
         full_data, latest_date = data_handler.get_full()
-        
+
+        if wants_parquet(request):
+            return parquet_response(full_data, latest_date, request)
+
         response_data = {
             "latestDate": latest_date,
             "data": full_data.to_dict(orient="records"),
@@ -35,6 +41,41 @@ def getFullData(target):
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/v1/full", methods=["GET"])
+def getFullDataForTargets():
+    try:
+        targets = request.args.get("targets", "").split(",")
+        targets = [target for target in targets if target]
+        if not targets:
+            return jsonify({"error": "No targets provided"}), 400
+
+        logger.info(f"Received full data request for: {targets}")
+        frames = MultiTargetDataHandler(targets).get_full()
+        latest_date = next(iter(frames.values()))[1]
+
+        if wants_parquet(request):
+            # long format, one row per (target, ds)
+            full_data = pd.concat(
+                {target: df for target, (df, _) in frames.items()}, names=["target"]
+            ).reset_index(level="target")
+            return parquet_response(full_data, latest_date, request)
+
+        response_data = {
+            "latestDate": latest_date,
+            "data": {
+                target: df.to_dict(orient="records")
+                for target, (df, _) in frames.items()
+            },
+        }
+
+        ip = request.environ.get("REMOTE_ADDR")
+        logger.info(f"Data successfully processed and sent to {ip}")
+        return jsonify(response_data), 200
+    except Exception as e:
+        logger.error(f"Error processing request: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/v1/<target>/latest", methods=["GET"])
 def getLatestData(target):
     try:
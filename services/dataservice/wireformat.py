@@ -0,0 +1,34 @@
+import io
+
+import pandas as pd
+from flask import Request, Response
+
+PARQUET_MIMETYPE = "application/vnd.apache.parquet"
+COMPRESSIONS = {"snappy", "gzip", "zstd", "none"}
+
+
+def wants_parquet(request: Request) -> bool:
+    best = request.accept_mimetypes.best_match(["application/json", PARQUET_MIMETYPE])
+    return best == PARQUET_MIMETYPE
+
+
+def parquet_response(df: pd.DataFrame, latest_date: str, request: Request) -> Response:
+    """Encodes df as parquet, compressed with the ?compression= codec (snappy by default)"""
+    compression = request.args.get("compression", "snappy")
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported compression: {compression}")
+
+    buffer = io.BytesIO()
+    df.to_parquet(
+        buffer,
+        engine="pyarrow",
+        compression=None if compression == "none" else compression,
+        index=False,
+    )
+
+    return Response(
+        buffer.getvalue(),
+        status=200,
+        mimetype=PARQUET_MIMETYPE,
+        headers={"X-Latest-Date": str(latest_date)},
+    )
@@ -1,10 +1,18 @@
 import logging
+import threading
+
 from flask import Flask, jsonify, request
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from register import ServiceRegistrationHandler
+from tasks.config import Config
 from tasks.factory import TaskFactory
+from tasks.forecasttable import forecast_tables
+from tasks.inline import inline_predictor
+from tasks.modelcache import model_cache
 from tasks.params import global_variables
+from tasks.reloader import model_reloader
+from tasks.resultcache import result_cache
 
 logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s", level=logging.INFO
@@ -20,6 +28,52 @@ limiter = Limiter(
     app=app,
     storage_uri="redis://localhost:6379/1",
 )
+config = Config()
+model_cache.add_listener(forecast_tables.on_model_loaded)
+model_cache.add_listener(result_cache.on_model_loaded)
+model_reloader.add_listener(forecast_tables.on_model_loaded)
+model_reloader.add_listener(result_cache.on_model_loaded)
+
+
+def warm_up_models():
+    for fuel_type, params in global_variables.items():
+        try:
+            model_cache.get(params["model"], params["version"])
+            logger.info(f"Forecast table ready for {fuel_type}")
+        except Exception as e:
+            logger.error(f"Could not preload model for {fuel_type}: {e}")
+
+
+threading.Thread(target=warm_up_models, daemon=True).start()
+model_reloader.start()
+
+
+def cached_response(fuel_type: str, cache_key: str, cached: dict):
+    if "result" in cached:
+        logger.info(f"Served {fuel_type} prediction from result cache")
+        return jsonify(
+            {"taskType": fuel_type, "status": "completed", "result": cached["result"]}
+        )
+
+    task_instance = TaskFactory().fuel_task(fuel_type).AsyncResult(cached["taskId"])
+    if task_instance.state == "SUCCESS":
+        result = task_instance.get()
+        result_cache.set(cache_key, {"result": result})
+        return jsonify(
+            {
+                "taskId": cached["taskId"],
+                "taskType": fuel_type,
+                "status": "completed",
+                "result": result,
+            }
+        )
+    elif task_instance.state == "FAILURE":
+        result_cache.delete(cache_key)
+        return None
+    else:
+        return jsonify(
+            {"taskId": cached["taskId"], "taskType": fuel_type, "status": "processing"}
+        )
 
 
 @limiter.limit("10 per minute")
@@ -29,21 +83,67 @@ def predict():
         data = request.json
         fuel_type = data.get("fuelType")
 
-        if fuel_type is None or fuel_type not in ["euro95", "diesel", "lpg"]:
+        if fuel_type is None or fuel_type not in config.prediction_routes:
             return (
                 jsonify(
                     {
-                        "error": "Invalid fuel type. Choose one of euro95, diesel, or lpg."
+                        "error": f"Invalid fuel type. Choose one of {', '.join(config.prediction_routes)}."
                     }
                 ),
                 400,
             )
 
-        task = (
-            TaskFactory()
-            .fuel_task(fuel_type)
-            .apply_async(args=[data], queue=f"{fuel_type}_queue")
+        dates = data.get("dates") or []
+        if len(dates) > config.max_prediction_dates:
+            return (
+                jsonify(
+                    {
+                        "error": f"At most {config.max_prediction_dates} dates can be predicted at once."
+                    }
+                ),
+                400,
+            )
+
+        intervals = not data.get("pointForecast", False)
+        table = forecast_tables.get(fuel_type)
+        results = (
+            table.lookup(dates, intervals) if table is not None and dates else None
         )
+        if results is not None:
+            logger.info(f"Served {len(dates)} {fuel_type} dates from forecast table")
+            return jsonify(
+                {
+                    "taskType": fuel_type,
+                    "status": "completed",
+                    "result": {"results": results},
+                }
+            )
+
+        cache_key = None
+        if dates:
+            params = global_variables[fuel_type]
+            cache_key = result_cache.make_key(
+                fuel_type, params["model"], params["version"], dates, intervals
+            )
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                response = cached_response(fuel_type, cache_key, cached)
+                if response is not None:
+                    return response
+
+            results = inline_predictor.predict(fuel_type, dates, intervals)
+            if results is not None:
+                result = {"results": results}
+                result_cache.set(cache_key, {"result": result})
+                logger.info(f"Predicted {len(dates)} {fuel_type} dates inline")
+                return jsonify(
+                    {"taskType": fuel_type, "status": "completed", "result": result}
+                )
+
+        # routed to the queue of the fuel type by the task router
+        task = TaskFactory().signature(fuel_type, data).apply_async()
+        if cache_key is not None:
+            result_cache.set(cache_key, {"taskId": task.id})
         logger.info(f"Provided data for {task.id}")
         return jsonify(
             {"taskId": task.id, "taskType": fuel_type, "status": "processing"}
@@ -0,0 +1,84 @@
+import threading
+from concurrent.futures import Future
+
+from .config import Config
+from .forecast import batch_forecast
+from .modelcache import model_cache
+
+
+class _Batch:
+    def __init__(self) -> None:
+        self.requests = []
+        self.full = threading.Event()
+
+
+class MicroBatcher:
+    """Merges concurrent forecasts of the same model into one predict call
+
+    The first request for a model waits up to window seconds, or until
+    max_requests requests joined, then predicts the union of all their dates
+    and hands every request its own slice. Callers block until their result
+    is ready, so no extra thread is needed.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.window = config.micro_batch_window
+        self.max_requests = config.micro_batch_max_requests
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def forecast(self, params: dict, dates: list, intervals: bool = True) -> list:
+        """Forecasts dates with the served model described by params"""
+        if self.window <= 0:
+            return self._predict(params, dates, intervals)
+
+        key = (
+            params["model"],
+            params["version"],
+            params["floor"],
+            params["cap"],
+            intervals,
+        )
+        future = Future()
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._pending[key] = _Batch()
+            batch.requests.append((dates, future))
+            if len(batch.requests) >= self.max_requests:
+                del self._pending[key]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+            self._run(batch, params, intervals)
+
+        return future.result()
+
+    def _run(self, batch: _Batch, params: dict, intervals: bool) -> None:
+        all_dates = [date for dates, _ in batch.requests for date in dates]
+        try:
+            results = self._predict(params, all_dates, intervals)
+        except Exception as e:
+            for _, future in batch.requests:
+                future.set_exception(e)
+            return
+
+        start = 0
+        for dates, future in batch.requests:
+            future.set_result(results[start : start + len(dates)])
+            start += len(dates)
+
+    @staticmethod
+    def _predict(params: dict, dates: list, intervals: bool) -> list:
+        model = model_cache.get(params["model"], params["version"])
+        return batch_forecast(
+            model, dates, params["floor"], params["cap"], intervals=intervals
+        )
+
+
+micro_batcher = MicroBatcher(Config())
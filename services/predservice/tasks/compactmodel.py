@@ -0,0 +1,81 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+from typing import Optional
+
+import mlflow
+import numpy as np
+from mlflow import MlflowClient
+from prophet import Prophet
+from prophet.serialize import model_from_dict
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_PATH = "inference"
+CONFIG_FILE = "model.json"
+
+
+def load_compact_model(directory: str) -> Prophet:
+    """Builds a predict-only model from an inference artifact
+
+    The fitted params are memory mapped, so processes loading the same
+    directory share one copy through the page cache.
+    """
+    with open(os.path.join(directory, CONFIG_FILE)) as f:
+        model_dict = json.load(f)
+
+    model = model_from_dict({**model_dict, "params": {}})
+    model.params = {
+        file[: -len(".npy")]: np.load(os.path.join(directory, file), mmap_mode="r")
+        for file in os.listdir(directory)
+        if file.endswith(".npy")
+    }
+    return model
+
+
+class CompactModelStore:
+    """Local disk cache of the inference artifacts logged by the trainer"""
+
+    def __init__(self, config: Config) -> None:
+        self.directory = config.compact_model_dir
+
+    def load(
+        self, model_name: str, model_version: int, client: MlflowClient
+    ) -> Optional[Prophet]:
+        """Returns the model, or None if its run logged no inference artifact"""
+        path = os.path.join(self.directory, model_name, str(model_version))
+        if not os.path.exists(os.path.join(path, CONFIG_FILE)):
+            try:
+                self._download(model_name, model_version, client, path)
+            except Exception as e:
+                logger.info(
+                    f"No inference artifact for {model_name} {model_version}: {e}"
+                )
+                return None
+        return load_compact_model(path)
+
+    def _download(
+        self, model_name: str, model_version: int, client: MlflowClient, path: str
+    ) -> None:
+        run_id = client.get_model_version(model_name, str(model_version)).run_id
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        staging = tempfile.mkdtemp(dir=os.path.dirname(path))
+        try:
+            downloaded = mlflow.artifacts.download_artifacts(
+                run_id=run_id, artifact_path=ARTIFACT_PATH, dst_path=staging
+            )
+            # the rename is atomic, a process racing us either wins or finds it in place
+            try:
+                os.rename(downloaded, path)
+            except OSError:
+                if not os.path.exists(os.path.join(path, CONFIG_FILE)):
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+
+compact_models = CompactModelStore(Config())
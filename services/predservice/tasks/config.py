@@ -1,5 +1,6 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import Optional
 
 import mlflow
 
@@ -12,6 +13,39 @@ class Config:
     aws_secret_access_key: str = "adminadmin"
     mlflow_s3_endpoint_url: str = "http://minio:9000"
     mlflow_tracking_uri: str = "http://mlflow-server:5000"
+    # one slot more than fuel types, so a reload does not push out another model
+    model_cache_size: int = 4
+    max_prediction_dates: int = 365
+    forecast_table_days_back: int = 30
+    forecast_table_days_ahead: int = 365
+    result_cache_size: int = 1024
+    result_cache_ttl: int = 3600
+    result_cache_redis_url: Optional[str] = None
+    compact_model_dir: str = "/data/models"
+    model_reload_interval: int = 60
+    model_reload_stage: str = "Production"
+    # requests of up to inline_max_dates are predicted by the API itself
+    inline_max_dates: int = 31
+    inline_workers: int = 4
+    inline_timeout: float = 5.0
+    # concurrent forecasts of a model within this many seconds share one predict
+    micro_batch_window: float = 0.01
+    micro_batch_max_requests: int = 16
+    celery_broker_url: str = "redis://redis:6379/0"
+    celery_backend_url: str = "redis://redis:6379/0"
+    # fuel type -> queue its predictions are sent to, several fuel types may
+    # share a queue and so a worker
+    prediction_routes: dict = field(
+        default_factory=lambda: {
+            "euro95": "euro95_queue",
+            "diesel": "diesel_queue",
+            "lpg": "lpg_queue",
+        }
+    )
+    # worker threads per queue, a worker gets the sum over the queues it consumes
+    queue_concurrency: dict = field(
+        default_factory=lambda: {"euro95_queue": 4, "diesel_queue": 4, "lpg_queue": 2}
+    )
 
     def setup_environment(self):
         os.environ["AWS_DEFAULT_REGION"] = self.aws_default_region
@@ -1,140 +1,69 @@
-from abc import ABC, abstractmethod
+from celery import Celery, Task
+from celery.canvas import Signature
 
-import pandas as pd
-import yaml
-from celery import Celery
-
-from .modelhandler import ModelRegistryHandler
+from .config import Config
+from .batcher import micro_batcher
+from .modelcache import model_cache
 from .params import global_variables
 
+config = Config()
+max_dates = config.max_prediction_dates
 
-class HandleTask(ABC):
-    @abstractmethod
-    def fuel_task(self) -> None:
-        pass
+prediction_celery = Celery(
+    "predictions",
+    broker=config.celery_broker_url,
+    backend=config.celery_backend_url,
+)
 
 
-class TaskFactory(HandleTask):
-    def fuel_task(self, fuel_type) -> Celery:
-        if fuel_type == "euro95":
-            return Euro95Task().fuel_task()
-        elif fuel_type == "diesel":
-            return DieselTask().fuel_task()
-        elif fuel_type == "lpg":
-            return LpgTask().fuel_task()
-        else:
-            raise ValueError("Invalid fuel type")
+def route_prediction(name, args, kwargs, options, task=None, **kw) -> dict | None:
+    """Sends a prediction to the queue its fuel type is routed to in the config"""
+    if name != "predict":
+        return None
+    fuel_type = args[0] if args else kwargs["fuel_type"]
+    return {"queue": config.prediction_routes[fuel_type]}
+
+
+prediction_celery.conf.task_routes = (route_prediction,)
+
+
+@prediction_celery.task(name="predict")
+def predict(fuel_type, data):
+    dates_to_predict = data.get("dates")
 
+    if dates_to_predict is None:
+        return {"error": "No dates provided for prediction"}
 
-class Euro95Task(HandleTask):
-    def __init__(self) -> None:
-        self.euro_celery = Celery(
-            "euro95_preds",
-            broker="redis://localhost:6379",
-            backend="redis://localhost:6379",
-        )
-
-    def fuel_task(self) -> Celery:
-        floor = global_variables["euro95"]["floor"]
-        cap = global_variables["euro95"]["cap"]
-        reg = ModelRegistryHandler("euro95_1-2024-03-04")
-        model = reg.load_model(model_version=1)
-
-        @self.euro_celery.task(queue="eu95_queue")
-        def predict_eu95(data):
-            dates_to_predict = data.get("dates")
-
-            if dates_to_predict is None:
-                return {"error": "No dates provided for prediction"}
-
-            results = []
-            for date_to_predict in dates_to_predict:
-                future = pd.DataFrame(
-                    {"ds": [date_to_predict], "floor": floor, "cap": cap}
-                )
-                forecast = model.predict(future)
-                result = {
-                    "ds": forecast["ds"].iloc[0],
-                    "yhat": forecast["yhat"].iloc[0],
-                }
-                results.append(result)
-
-            return {"results": results}
-
-        return predict_eu95
-
-
-class DieselTask(HandleTask):
-    def __init__(self) -> None:
-        self.diesel_celery = Celery(
-            "disel_preds",
-            broker="redis://localhost:6379",
-            backend="redis://localhost:6379",
-        )
-
-    def fuel_task(self) -> Celery:
-        floor = global_variables["diesel"]["floor"]
-        cap = global_variables["diesel"]["cap"]
-        reg = ModelRegistryHandler("diesel_2-2024-03-04")
-        model = reg.load_model(model_version=1)
-
-        @self.diesel_celery.task(queue="diesel_queue")
-        def predict_diesel(data):
-            dates_to_predict = data.get("dates")
-
-            if dates_to_predict is None:
-                return {"error": "No dates provided for prediction"}
-
-            results = []
-            for date_to_predict in dates_to_predict:
-                future = pd.DataFrame(
-                    {"ds": [date_to_predict], "floor": floor, "cap": cap}
-                )
-                forecast = model.predict(future)
-                result = {
-                    "ds": forecast["ds"].iloc[0],
-                    "yhat": forecast["yhat"].iloc[0],
-                }
-                results.append(result)
-
-            return {"results": results}
-
-        return predict_diesel
-
-
-class LpgTask(HandleTask):
-    def __init__(self):
-        self.lpg_celery = Celery(
-            "lpg_preds",
-            broker="redis://redis:6379",
-            backend="redis://redis:6379",
-        )
-
-    def fuel_task(self) -> Celery:
-        floor = global_variables["lpg"]["floor"]
-        cap = global_variables["lpg"]["cap"]
-        reg = ModelRegistryHandler("lpg_3-2024-03-04")
-        model = reg.load_model(model_version=1)
-
-        @self.lpg_celery.task(queue="lpg_queue")
-        def predict_lpg(data):
-            dates_to_predict = data.get("dates")
-
-            if dates_to_predict is None:
-                return {"error": "No dates provided for prediction"}
-
-            results = []
-            for date_to_predict in dates_to_predict:
-                future = pd.DataFrame(
-                    {"ds": [date_to_predict], "floor": floor, "cap": cap}
-                )
-                forecast = model.predict(future)
-                result = {
-                    "ds": forecast["ds"].iloc[0],
-                    "yhat": forecast["yhat"].iloc[0],
-                }
-                results.append(result)
-
-            return {"results": results}
-
-        return predict_lpg
+    if len(dates_to_predict) > max_dates:
+        return {"error": f"At most {max_dates} dates can be predicted at once"}
+
+    # read per call, the model reloader may have swapped the entry
+    params = global_variables[fuel_type]
+    # point forecasts skip the sampling of yhat_lower and yhat_upper
+    intervals = not data.get("pointForecast", False)
+    results = micro_batcher.forecast(params, dates_to_predict, intervals)
+
+    return {"results": results}
+
+
+class TaskFactory:
+    def fuel_task(self, fuel_type) -> Task:
+        if fuel_type not in config.prediction_routes:
+            raise ValueError("Invalid fuel type")
+        return predict
+
+    def signature(self, fuel_type, data) -> Signature:
+        return self.fuel_task(fuel_type).s(fuel_type, data)
+
+    def fuel_types(self, queues: list) -> list:
+        """Fuel types whose predictions are routed to any of queues"""
+        return [
+            fuel_type
+            for fuel_type, queue in config.prediction_routes.items()
+            if queue in queues
+        ]
+
+    def preload(self, fuel_types: list) -> None:
+        for fuel_type in fuel_types:
+            params = global_variables[fuel_type]
+            model_cache.get(params["model"], params["version"])
@@ -0,0 +1,38 @@
+import copy
+
+import pandas as pd
+
+
+def point_model(model):
+    """Shallow copy of model that skips the uncertainty sampling of predict
+
+    Prophet draws uncertainty_samples trajectories per predict to compute
+    yhat_lower and yhat_upper, which dominates inference time.
+    """
+    point = copy.copy(model)
+    point.uncertainty_samples = 0
+    return point
+
+
+def batch_forecast(
+    model, dates: list, floor: float, cap: float, intervals: bool = True
+) -> list:
+    """Runs a single predict over all requested dates
+
+    Prophet sorts the future frame, so the forecast is reindexed back to the
+    order of the request. Duplicate dates are only predicted once. Without
+    intervals only yhat is computed and returned.
+    """
+    ds = pd.to_datetime(pd.Series(dates), format="mixed")
+    future = pd.DataFrame({"ds": ds.drop_duplicates(), "floor": floor, "cap": cap})
+    if not intervals:
+        model = point_model(model)
+    columns = ["yhat", "yhat_lower", "yhat_upper"] if intervals else ["yhat"]
+    forecast = model.predict(future).set_index("ds")[columns].reindex(ds)
+
+    return [
+        {"ds": date, **values}
+        for date, values in zip(
+            ds.dt.strftime("%Y-%m-%d"), forecast.to_dict(orient="records")
+        )
+    ]
@@ -0,0 +1,115 @@
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from .config import Config
+from .params import global_variables
+
+
+class ForecastTable:
+    """Forecast over a contiguous daily range, looked up by day offset"""
+
+    def __init__(
+        self,
+        model_name: str,
+        model_version: int,
+        start: np.datetime64,
+        yhat: np.ndarray,
+        yhat_lower: np.ndarray,
+        yhat_upper: np.ndarray,
+    ) -> None:
+        self.model_name = model_name
+        self.model_version = model_version
+        self.start = start
+        self.yhat = yhat
+        self.yhat_lower = yhat_lower
+        self.yhat_upper = yhat_upper
+
+    @classmethod
+    def build(
+        cls,
+        model,
+        model_name: str,
+        model_version: int,
+        start: date,
+        end: date,
+        floor: float,
+        cap: float,
+    ) -> "ForecastTable":
+        dates = pd.date_range(start, end, freq="D")
+        future = pd.DataFrame({"ds": dates, "floor": floor, "cap": cap})
+        forecast = model.predict(future)
+
+        return cls(
+            model_name,
+            model_version,
+            dates[0].to_datetime64().astype("datetime64[D]"),
+            forecast["yhat"].to_numpy(),
+            forecast["yhat_lower"].to_numpy(),
+            forecast["yhat_upper"].to_numpy(),
+        )
+
+    def lookup(self, dates: list, intervals: bool = True) -> list | None:
+        """Returns results in request order, or None if any date is not covered"""
+        ds = pd.to_datetime(pd.Series(dates), format="mixed")
+        if not (ds == ds.dt.normalize()).all():
+            return None
+
+        offsets = (ds.to_numpy().astype("datetime64[D]") - self.start).astype(np.int64)
+        if offsets.min() < 0 or offsets.max() >= self.yhat.shape[0]:
+            return None
+
+        days = ds.dt.strftime("%Y-%m-%d")
+        if not intervals:
+            return [
+                {"ds": date, "yhat": value}
+                for date, value in zip(days, self.yhat[offsets])
+            ]
+        return [
+            {"ds": date, "yhat": value, "yhat_lower": lower, "yhat_upper": upper}
+            for date, value, lower, upper in zip(
+                days,
+                self.yhat[offsets],
+                self.yhat_lower[offsets],
+                self.yhat_upper[offsets],
+            )
+        ]
+
+
+class ForecastTableStore:
+    """Holds the current forecast table of every fuel type"""
+
+    def __init__(self, config: Config) -> None:
+        self.days_back = config.forecast_table_days_back
+        self.days_ahead = config.forecast_table_days_ahead
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def get(self, fuel_type: str) -> ForecastTable | None:
+        with self._lock:
+            return self._tables.get(fuel_type)
+
+    def refresh(self, fuel_type: str, model_name: str, model_version: int, model) -> None:
+        params = global_variables[fuel_type]
+        today = date.today()
+        table = ForecastTable.build(
+            model,
+            model_name,
+            model_version,
+            today - timedelta(days=self.days_back),
+            today + timedelta(days=self.days_ahead),
+            params["floor"],
+            params["cap"],
+        )
+        with self._lock:
+            self._tables[fuel_type] = table
+
+    def on_model_loaded(self, model_name: str, model_version: int, model) -> None:
+        for fuel_type, params in global_variables.items():
+            if params["model"] == model_name:
+                self.refresh(fuel_type, model_name, model_version, model)
+
+
+forecast_tables = ForecastTableStore(Config())
@@ -0,0 +1,60 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Optional
+
+from .config import Config
+from .batcher import micro_batcher
+from .modelcache import model_cache
+from .params import global_variables
+
+logger = logging.getLogger(__name__)
+
+
+class InlinePredictor:
+    """Predicts small requests in the API process from models already in the cache
+
+    At most max_workers predictions run at once. When all of them are busy,
+    the model is not loaded yet or a prediction takes longer than timeout,
+    predict returns None and the caller falls back to the Celery workers.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.max_dates = config.inline_max_dates
+        self.timeout = config.inline_timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=config.inline_workers, thread_name_prefix="inline-predict"
+        )
+        self._slots = threading.BoundedSemaphore(config.inline_workers)
+
+    def accepts(self, dates: list) -> bool:
+        return 0 < len(dates) <= self.max_dates
+
+    def predict(
+        self, fuel_type: str, dates: list, intervals: bool = True
+    ) -> Optional[list]:
+        params = global_variables[fuel_type]
+        if not self.accepts(dates):
+            return None
+        if (params["model"], params["version"]) not in model_cache:
+            return None
+        if not self._slots.acquire(blocking=False):
+            return None
+
+        try:
+            future = self._executor.submit(
+                micro_batcher.forecast, params, dates, intervals
+            )
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            logger.warning(f"Inline {fuel_type} prediction timed out, queueing it")
+            return None
+
+
+inline_predictor = InlinePredictor(Config())
@@ -0,0 +1,61 @@
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+from .config import Config
+from .modelhandler import ModelRegistryHandler
+
+
+class ModelCache:
+    """Process wide LRU cache of registered models keyed by (name, version)"""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._models = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_locks = {}
+        self._listeners = []
+
+    def add_listener(self, listener: Callable) -> None:
+        """Registers listener(model_name, model_version, model), called after each load"""
+        self._listeners.append(listener)
+
+    def get(self, model_name: str, model_version: int):
+        key = (model_name, model_version)
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # only one thread downloads a given model, the others wait for it
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    return self._models[key]
+
+            reg = ModelRegistryHandler(model_name)
+            model = reg.load_model(model_version=model_version)
+
+            with self._lock:
+                self._models[key] = model
+                while len(self._models) > self.max_size:
+                    self._models.popitem(last=False)
+                self._load_locks.pop(key, None)
+
+            for listener in self._listeners:
+                listener(model_name, model_version, model)
+
+        return model
+
+    def evict(self, model_name: str, model_version: int) -> None:
+        with self._lock:
+            self._models.pop((model_name, model_version), None)
+
+    def __contains__(self, key) -> bool:
+        with self._lock:
+            return key in self._models
+
+
+model_cache = ModelCache(max_size=Config().model_cache_size)
@@ -3,23 +3,27 @@ from typing import Optional
 import mlflow
 import mlflow.prophet
 from mlflow import MlflowClient
+from mlflow.entities.model_registry import ModelVersion
 
+from .compactmodel import compact_models
 from .config import Config
 
 
 class ModelRegistryHandler:
-    def __init__(
-        self, model_name: str, client: Optional[MlflowClient] = MlflowClient()
-    ) -> None:
+    def __init__(self, model_name: str, client: Optional[MlflowClient] = None) -> None:
         self.model_name = model_name
-        self.client = client
         self.config = Config()
         self.config.setup_environment()
+        # created after the environment is set up, so it talks to the tracking server
+        self.client = client or MlflowClient()
 
     def load_model(self, model_version: int):
-        model = mlflow.prophet.load_model(
-            model_uri=f"models:/{self.model_name}/{model_version}"
-        )
+        # the compact artifact loads much faster, older models only have the full one
+        model = compact_models.load(self.model_name, model_version, self.client)
+        if model is None:
+            model = mlflow.prophet.load_model(
+                model_uri=f"models:/{self.model_name}/{model_version}"
+            )
         return model
 
     def transition_model_stage(self, version: int, stage: str) -> None:
@@ -27,6 +31,24 @@ class ModelRegistryHandler:
             name=f"{self.model_name}", version=version, stage=f"{stage}"
         )
 
+    def latest_target_version(self, stage: str) -> Optional[ModelVersion]:
+        """Newest version in stage among the models registered as {model_name}-{date}
+
+        The trainer registers a new model per run date, so model_name is the
+        target here, e.g. lpg_3.
+        """
+        versions = [
+            mv
+            for mv in self.client.search_model_versions(
+                f"name LIKE '{self.model_name}-%'"
+            )
+            if mv.current_stage == stage
+        ]
+        return max(versions, key=lambda mv: mv.creation_timestamp, default=None)
+
+    def run_params(self, run_id: str) -> dict:
+        return self.client.get_run(run_id).data.params
+
     def get_model_info(self, stage: str) -> None:
         for mv in self.client.search_model_versions(f"name='{self.model_name}'"):
             info = dict(mv)
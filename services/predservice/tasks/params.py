@@ -1,18 +1,26 @@
+# served model per fuel type. The pinned entries are used until the model
+# reloader finds a newer version of the target in the registry and replaces
+# the whole entry of that fuel type
 global_variables = {
     "lpg": {
+        "target": "lpg_3",
         "cap": 1.174,
-        "floor": 0.435, 
-        "model": ""
+        "floor": 0.435,
+        "model": "lpg_3-2024-03-04",
+        "version": 1,
     },
     "diesel": {
+        "target": "diesel_2",
         "cap": 2.277,
         "floor": 0.93,
-        "model": "",
+        "model": "diesel_2-2024-03-04",
+        "version": 1,
     },
     "euro95": {
+        "target": "euro95_1",
         "cap": 2.383,
         "floor": 1.151,
-        "model": "",
+        "model": "euro95_1-2024-03-04",
+        "version": 1,
     },
 }
-
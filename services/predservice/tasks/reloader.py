@@ -0,0 +1,93 @@
+import logging
+import threading
+import time
+from typing import Callable
+
+from .config import Config
+from .modelcache import model_cache
+from .modelhandler import ModelRegistryHandler
+from .params import global_variables
+
+logger = logging.getLogger(__name__)
+
+
+class ModelReloader:
+    """Polls the registry and swaps in the newest version of every fuel's target
+
+    A new version is loaded into the model cache first and only then becomes
+    the served entry of its fuel type, so requests never wait for a download.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.interval = config.model_reload_interval
+        self.stage = config.model_reload_stage
+        self._handlers = {}
+        self._listeners = []
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable) -> None:
+        """Registers listener(model_name, model_version, model), called after each swap"""
+        self._listeners.append(listener)
+
+    def start(self) -> None:
+        """Starts polling in a daemon thread, a no-op if already running or disabled"""
+        with self._lock:
+            if self.interval <= 0:
+                return
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(
+                target=self._poll, name="model-reloader", daemon=True
+            )
+            self._thread.start()
+
+    def check(self, fuel_type: str) -> bool:
+        """Swaps in a newer registry version for fuel_type, returns whether it did"""
+        params = global_variables[fuel_type]
+        handler = self._handler(params["target"])
+        latest = handler.latest_target_version(self.stage)
+        if latest is None:
+            return False
+
+        version = int(latest.version)
+        if (latest.name, version) == (params["model"], params["version"]):
+            return False
+
+        model = model_cache.get(latest.name, version)
+        run_params = handler.run_params(latest.run_id)
+        served = {
+            **params,
+            "model": latest.name,
+            "version": version,
+            "stage": self.stage,
+            "cap": float(run_params.get("cap", params["cap"])),
+            "floor": float(run_params.get("floor", params["floor"])),
+        }
+        # a single assignment, readers see either the old or the new entry
+        # the old model is not evicted, requests that read the old entry may
+        # still ask for it. model_cache_size leaves a spare slot, so the LRU
+        # drops it once it is no longer used
+        global_variables[fuel_type] = served
+        logger.info(f"Serving {latest.name} version {version} for {fuel_type}")
+
+        for listener in self._listeners:
+            listener(latest.name, version, model)
+        return True
+
+    def _poll(self) -> None:
+        while True:
+            for fuel_type in list(global_variables):
+                try:
+                    self.check(fuel_type)
+                except Exception as e:
+                    logger.error(f"Model reload check failed for {fuel_type}: {e}")
+            time.sleep(self.interval)
+
+    def _handler(self, target: str) -> ModelRegistryHandler:
+        if target not in self._handlers:
+            self._handlers[target] = ModelRegistryHandler(target)
+        return self._handlers[target]
+
+
+model_reloader = ModelReloader(Config())
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import pandas as pd
+import redis
+
+from .config import Config
+from .params import global_variables
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """Prediction results keyed by fuel type, model version and requested dates
+
+    Entries live in an in-process LRU and, when a redis url is configured, in
+    redis as well so that every API process shares them.
+    """
+
+    def __init__(self, max_size: int, ttl: int, redis_url: Optional[str] = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = redis.Redis.from_url(redis_url) if redis_url else None
+
+    @staticmethod
+    def make_key(
+        fuel_type: str,
+        model_name: str,
+        model_version: int,
+        dates: list,
+        intervals: bool = True,
+    ) -> str:
+        ds = pd.to_datetime(pd.Series(dates), format="mixed")
+        normalized = ds.dt.strftime("%Y-%m-%d %H:%M:%S").tolist()
+        digest = hashlib.sha256(json.dumps(normalized).encode()).hexdigest()
+        mode = "full" if intervals else "point"
+        return f"predictions:{fuel_type}:{model_name}:{model_version}:{mode}:{digest}"
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return value
+                del self._entries[key]
+
+        if self._redis is None:
+            return None
+        try:
+            raw = self._redis.get(key)
+        except redis.RedisError as e:
+            logger.warning(f"Result cache redis lookup failed: {e}")
+            return None
+        if raw is None:
+            return None
+
+        value = json.loads(raw)
+        self._set_local(key, value)
+        return value
+
+    def set(self, key: str, value: dict) -> None:
+        self._set_local(key, value)
+        if self._redis is None:
+            return
+        try:
+            self._redis.set(key, json.dumps(value), ex=self.ttl)
+        except redis.RedisError as e:
+            logger.warning(f"Result cache redis write failed: {e}")
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+        if self._redis is None:
+            return
+        try:
+            self._redis.delete(key)
+        except redis.RedisError as e:
+            logger.warning(f"Result cache redis delete failed: {e}")
+
+    def invalidate(self, fuel_type: str, model_name: str, model_version: int) -> None:
+        """Drops every entry of fuel_type that was not produced by the given model version"""
+        prefix = f"predictions:{fuel_type}:"
+        current = f"{prefix}{model_name}:{model_version}:"
+
+        with self._lock:
+            stale = [
+                key
+                for key in self._entries
+                if key.startswith(prefix) and not key.startswith(current)
+            ]
+            for key in stale:
+                del self._entries[key]
+
+        if self._redis is None:
+            return
+        try:
+            for key in self._redis.scan_iter(match=f"{prefix}*"):
+                if not key.decode().startswith(current):
+                    self._redis.delete(key)
+        except redis.RedisError as e:
+            logger.warning(f"Result cache redis invalidation failed: {e}")
+
+    def on_model_loaded(self, model_name: str, model_version: int, model) -> None:
+        for fuel_type, params in global_variables.items():
+            if params["model"] == model_name:
+                self.invalidate(fuel_type, model_name, model_version)
+
+    def _set_local(self, key: str, value: dict) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+config = Config()
+result_cache = ResultCache(
+    config.result_cache_size, config.result_cache_ttl, config.result_cache_redis_url
+)
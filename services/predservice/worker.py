@@ -0,0 +1,43 @@
+import argparse
+
+from tasks.config import Config
+from tasks.factory import TaskFactory, prediction_celery
+from tasks.reloader import model_reloader
+
+app = prediction_celery
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Prediction worker")
+    parser.add_argument(
+        "--queues",
+        help="comma separated queues to consume, all routed queues by default",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        help="worker threads, the configured concurrency of the queues by default",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    config = Config()
+    queues = (
+        args.queues.split(",")
+        if args.queues
+        else sorted(set(config.prediction_routes.values()))
+    )
+    concurrency = args.concurrency or sum(
+        config.queue_concurrency.get(queue, 1) for queue in queues
+    )
+
+    TaskFactory().preload(TaskFactory().fuel_types(queues))
+    model_reloader.start()
+
+    # threads share one model cache, so every model is held once per worker
+    worker = app.Worker(
+        queues=queues, concurrency=concurrency, pool="threads", loglevel="INFO"
+    )
+    worker.start()
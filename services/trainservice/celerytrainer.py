@@ -1,26 +1,201 @@
+import multiprocessing
+import queue
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from datetime import datetime
+from typing import Optional
 
-import pandas as pd
 import pytz
 from celery import Celery
+from config import Config
+from dataclient import DataServiceClient
+from profiles import load_profile
+from progress import ProgressReporter
+from staging import DatasetStager
 from train import TrainingStrategyBuilder
 
 ny_timezone = pytz.timezone("America/New_York")
-ny_time = datetime.now(ny_timezone)
-ny_date = ny_time.date()
 
 trainer_celery = Celery(
     "celery_trainer", broker="redis://redis:6379/0", backend="redis://redis:6379/0"
 )
 
+# seconds between progress reports of a multi-target job
+progress_interval = 5
 
-@trainer_celery.task
-def trigger_training_pipeline(data, target) -> None:
-    df = pd.DataFrame(data)
 
-    auto_trainer = (
+def task_reporter(task_id: Optional[str]) -> ProgressReporter:
+    """Publishes progress as the PROGRESS state of task_id, keeping the timings already stored there"""
+    if task_id is None:
+        return ProgressReporter()
+
+    timings = None
+    previous = trainer_celery.AsyncResult(task_id)
+    if previous.state == "PROGRESS" and isinstance(previous.info, dict):
+        timings = previous.info.get("timings")
+
+    def publish(meta: dict) -> None:
+        trainer_celery.backend.store_result(task_id, meta, "PROGRESS")
+
+    return ProgressReporter(publish, timings)
+
+
+class _QueuePublisher:
+    """Forwards the progress of one target from a pool process to the parent"""
+
+    def __init__(self, updates, target: str) -> None:
+        self.updates = updates
+        self.target = target
+
+    def __call__(self, meta: dict) -> None:
+        self.updates.put((self.target, meta))
+
+
+def _drain_updates(updates, progress: dict) -> None:
+    try:
+        while True:
+            target, meta = updates.get_nowait()
+            progress[target] = meta
+    except queue.Empty:
+        pass
+
+
+def run_training(
+    dataset_ref: str,
+    target: str,
+    incremental: bool = False,
+    n_jobs: Optional[int] = None,
+    reporter: Optional[ProgressReporter] = None,
+    profile_overrides: Optional[dict] = None,
+) -> dict:
+    """Trains and registers a model for target, returns the timing breakdown
+
+    n_jobs is an upper bound on the search processes, e.g. a share of a cpu budget.
+    """
+    reporter = reporter or ProgressReporter()
+    config = Config()
+    profile = load_profile(target, config.training_profiles_path, profile_overrides)
+    reporter.stage("loading data", target=target)
+    df = DatasetStager(config).load(dataset_ref)
+
+    profile_jobs = profile.n_jobs if profile.n_jobs is not None else config.optuna_n_jobs
+    run_date = datetime.now(ny_timezone).date()
+    builder = (
         TrainingStrategyBuilder(df)
-        .set_auto_training_params(f"{target}-{ny_date}", 3, "best_experiments")
-        .build_auto_trainer()
+        .set_auto_training_params(
+            f"{target}-{run_date}",
+            profile.num_trials,
+            profile.experiment_name,
+            min(profile_jobs, n_jobs) if n_jobs is not None else profile_jobs,
+            fold_jobs=config.cv_fold_jobs,
+        )
+        .set_profile(profile)
+        .set_stopping(profile.timeout, profile.patience)
     )
-    auto_trainer.train()
+    if incremental:
+        builder.set_warm_start(target)
+
+    auto_trainer = builder.build_auto_trainer()
+    auto_trainer.train(reporter)
+    return {"target": target, **reporter.finish()}
+
+
+def write_training_date(latest_date: str) -> None:
+    with open(Config().training_date_path, "w") as f:
+        f.write(latest_date)
+
+
+@trainer_celery.task
+def fetch_training_data(target, job_id=None) -> str:
+    """Downloads and stages the data of a target, returns the dataset reference
+
+    Progress is published under job_id, the id of the training task that follows.
+    """
+    reporter = task_reporter(job_id)
+    reporter.stage("fetching", target=target)
+    df, latest_date = DataServiceClient().get_full(target)
+    reporter.stage("staging", target=target, rows=len(df))
+    dataset_ref = DatasetStager(Config()).stage(df)
+    write_training_date(latest_date)
+    reporter.finish()
+    return dataset_ref
+
+
+@trainer_celery.task
+def fetch_training_data_many(targets, job_id=None) -> dict:
+    """Downloads all targets in one request and stages each, returns {target: reference}"""
+    reporter = task_reporter(job_id)
+    reporter.stage("fetching", targets=targets)
+    frames, latest_date = DataServiceClient().get_full_many(targets)
+    reporter.stage("staging", targets=targets)
+    stager = DatasetStager(Config())
+    dataset_refs = {target: stager.stage(df) for target, df in frames.items()}
+    write_training_date(latest_date)
+    reporter.finish()
+    return dataset_refs
+
+
+@trainer_celery.task(bind=True)
+def trigger_training_pipeline(
+    self, dataset_ref, target, incremental=False, profile=None
+) -> dict:
+    return run_training(
+        dataset_ref,
+        target,
+        incremental,
+        reporter=task_reporter(self.request.id),
+        profile_overrides=profile,
+    )
+
+
+@trainer_celery.task(bind=True)
+def trigger_multi_training_pipeline(
+    self, dataset_refs, cpu_budget, incremental=False, profiles=None
+) -> dict:
+    """Trains every target in its own process, splitting cpu_budget between them
+
+    profiles optionally maps a target to overrides of its training profile.
+    The progress of every target's own stages is published under targetProgress.
+    """
+    profiles = profiles or {}
+    n_jobs = max(1, cpu_budget // len(dataset_refs))
+    reporter = task_reporter(self.request.id)
+    status = {target: "Running" for target in dataset_refs}
+    progress = {}
+    reporter.stage("training", targets=status)
+
+    mp_context = multiprocessing.get_context("spawn")
+    with mp_context.Manager() as manager, ProcessPoolExecutor(
+        max_workers=min(len(dataset_refs), cpu_budget), mp_context=mp_context
+    ) as executor:
+        # the pool processes cannot publish, so they send their progress here
+        updates = manager.Queue()
+        futures = {
+            executor.submit(
+                run_training,
+                ref,
+                target,
+                incremental,
+                n_jobs,
+                ProgressReporter(_QueuePublisher(updates, target)),
+                profiles.get(target),
+            ): target
+            for target, ref in dataset_refs.items()
+        }
+
+        timings = {}
+        pending = set(futures)
+        while pending:
+            done, pending = wait(
+                pending, timeout=progress_interval, return_when=FIRST_COMPLETED
+            )
+            _drain_updates(updates, progress)
+            for future in done:
+                target = futures[future]
+                try:
+                    timings[target] = future.result()["timings"]
+                    status[target] = "Completed"
+                except Exception as e:
+                    status[target] = f"Failed: {e}"
+            reporter.update(targets=status, targetProgress=progress)
+
+    return {"targets": status, "targetTimings": timings, **reporter.finish()}
@@ -0,0 +1,35 @@
+import json
+import os
+
+import numpy as np
+from prophet import Prophet
+from prophet.serialize import model_to_dict
+
+# predict only needs the spacing of the last history rows, not the full history
+HISTORY_TAIL = 10
+CONFIG_FILE = "model.json"
+
+
+def save_compact_model(model: Prophet, directory: str) -> None:
+    """Writes the inference artifact of a fitted model into directory
+
+    The fitted params go to one .npy file each, so the prediction service can
+    memory map them, the rest of the model to a small json config.
+    """
+    model_dict = model_to_dict(model)
+    model_dict.pop("params")
+    model_dict["fit_kwargs"] = {}
+    model_dict["history"] = model.history.tail(HISTORY_TAIL).to_json(
+        orient="table", index=False
+    )
+    model_dict["history_dates"] = model.history_dates.tail(HISTORY_TAIL).to_json(
+        orient="split", date_format="iso"
+    )
+
+    with open(os.path.join(directory, CONFIG_FILE), "w") as f:
+        json.dump(model_dict, f)
+    for name, value in model.params.items():
+        # the fitted trend grows with the history and is recomputed by predict
+        if name == "trend":
+            continue
+        np.save(os.path.join(directory, f"{name}.npy"), np.asarray(value))
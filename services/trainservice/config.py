@@ -1,5 +1,6 @@
 import os
 from dataclasses import dataclass
+from typing import Optional
 
 import mlflow
 
@@ -12,6 +13,16 @@ class Config:
     aws_secret_access_key: str = "adminadmin"
     mlflow_s3_endpoint_url: str = "http://minio:9000"
     mlflow_tracking_uri: str = "http://mlflow-server:5000"
+    staging_dir: str = "/data/staging"
+    staging_bucket: Optional[str] = None
+    staging_retention: int = 7 * 24 * 3600
+    training_date_path: str = "/data/staging/date.txt"
+    optuna_storage_dir: str = "/tmp/optuna"
+    optuna_n_jobs: int = 4
+    trial_model_capacity: int = 3
+    cv_fold_jobs: int = 1
+    training_cpu_budget: int = 4
+    training_profiles_path: str = "profiles.yaml"
 
     def setup_environment(self):
         os.environ["AWS_DEFAULT_REGION"] = self.aws_default_region
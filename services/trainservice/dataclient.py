@@ -0,0 +1,57 @@
+import io
+
+import pandas as pd
+import requests
+
+PARQUET_MIMETYPE = "application/vnd.apache.parquet"
+
+
+class DataServiceClient:
+    """Fetches training data from the data service, preferring parquet over json"""
+
+    def __init__(self, discovery_url: str = "http://service-discovery:8000") -> None:
+        self.discovery_url = discovery_url
+
+    def get_full(self, target: str) -> tuple[pd.DataFrame, str]:
+        response = requests.get(
+            f"{self._base_url()}/api/v1/{target}/full",
+            headers={"Accept": f"{PARQUET_MIMETYPE}, application/json;q=0.5"},
+        )
+        response.raise_for_status()
+
+        if response.headers.get("Content-Type", "").startswith(PARQUET_MIMETYPE):
+            df = pd.read_parquet(io.BytesIO(response.content), engine="pyarrow")
+            return df, response.headers["X-Latest-Date"]
+
+        response_data = response.json()
+        return pd.DataFrame(response_data["data"]), response_data["latestDate"]
+
+    def get_full_many(self, targets: list) -> tuple[dict, str]:
+        """Fetches several targets in one request, returns ({target: df}, latest_date)"""
+        response = requests.get(
+            f"{self._base_url()}/api/v1/full",
+            params={"targets": ",".join(targets)},
+            headers={"Accept": f"{PARQUET_MIMETYPE}, application/json;q=0.5"},
+        )
+        response.raise_for_status()
+
+        if response.headers.get("Content-Type", "").startswith(PARQUET_MIMETYPE):
+            df = pd.read_parquet(io.BytesIO(response.content), engine="pyarrow")
+            frames = {
+                target: group.drop(columns="target").reset_index(drop=True)
+                for target, group in df.groupby("target", sort=False)
+            }
+            return frames, response.headers["X-Latest-Date"]
+
+        response_data = response.json()
+        frames = {
+            target: pd.DataFrame(records)
+            for target, records in response_data["data"].items()
+        }
+        return frames, response_data["latestDate"]
+
+    def _base_url(self) -> str:
+        service_info = requests.get(f"{self.discovery_url}/discover/dataservice").json()
+        dataservice_ip = service_info.get("name")
+        dataservice_port = service_info.get("port")
+        return f"http://{dataservice_ip}:{dataservice_port}"
@@ -0,0 +1,91 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from prophet import Prophet
+
+
+class RollingOriginEvaluator:
+    """Scores Prophet candidates over rolling-origin folds
+
+    Every fold validates on the `horizon` rows following its cutoff and the
+    last fold validates on the final `horizon` rows of the history. The last
+    fold trains on all rows before its cutoff, the earlier ones only on the
+    `window` rows before theirs, so they are cheap to fit. Folds are
+    fitted in a thread pool: Stan runs in a cmdstan subprocess, so the fits
+    proceed in parallel while the threads wait on them.
+    """
+
+    def __init__(
+        self,
+        history: pd.DataFrame,
+        n_folds: int,
+        horizon: int,
+        n_jobs: int = 1,
+        window: Optional[int] = None,
+    ) -> None:
+        self.n_jobs = n_jobs
+        self.folds = []
+        for i in reversed(range(n_folds)):
+            cutoff = history.shape[0] - (i + 1) * horizon
+            if cutoff < 2 * horizon:
+                continue
+            start = 0 if i == 0 or window is None else max(0, cutoff - window)
+            self.folds.append(
+                (history.iloc[start:cutoff], history.iloc[cutoff : cutoff + horizon])
+            )
+        if not self.folds:
+            raise ValueError(
+                f"No fold fits: {history.shape[0]} rows cannot hold a training window "
+                f"of at least {2 * horizon} rows followed by a {horizon} row horizon"
+            )
+
+        # actuals of every fold stacked into a (folds, horizon) matrix
+        self.y = np.stack([val["y"].to_numpy(dtype=np.float64) for _, val in self.folds])
+
+    def iter_folds(
+        self, make_model: Callable[[], Prophet], **fit_kwargs
+    ) -> Iterator[tuple[int, Prophet, np.ndarray]]:
+        """Yields (fold index, fitted model, yhat) in fold order
+
+        At most n_jobs folds are in flight and the next one is only submitted
+        once the caller resumes, so closing the iterator, e.g. on a pruned
+        trial, never waits on a fit whose result nobody reads.
+        """
+
+        def fit_fold(fold: tuple) -> tuple[Prophet, np.ndarray]:
+            fold_train, fold_val = fold
+            m = make_model()
+            m.fit(fold_train, **fit_kwargs)
+            yhat = m.predict(fold_val[["ds", "cap", "floor"]])["yhat"].to_numpy()
+            return m, yhat
+
+        folds = iter(self.folds)
+        executor = ThreadPoolExecutor(max_workers=self.n_jobs)
+        try:
+            pending = deque(
+                executor.submit(fit_fold, fold) for fold in islice(folds, self.n_jobs)
+            )
+            step = 0
+            while pending:
+                m, yhat = pending.popleft().result()
+                yield step, m, yhat
+                step += 1
+                for fold in islice(folds, 1):
+                    pending.append(executor.submit(fit_fold, fold))
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def fold_metrics(y: np.ndarray, yhat: np.ndarray) -> dict:
+    """MAE, MSE and MAPE per fold for (folds, horizon) matrices"""
+    errors = yhat - y
+    eps = np.finfo(np.float64).eps
+    return {
+        "mae": np.abs(errors).mean(axis=-1),
+        "mse": np.square(errors).mean(axis=-1),
+        "mape": (np.abs(errors) / np.maximum(np.abs(y), eps)).mean(axis=-1),
+    }
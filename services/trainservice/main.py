@@ -1,9 +1,14 @@
 import logging
 
-import requests
+from celery import chain
 from celery.result import AsyncResult
-from celerytrainer import trigger_training_pipeline
+from celery.utils import uuid
+from celerytrainer import (fetch_training_data, fetch_training_data_many,
+                           trigger_multi_training_pipeline,
+                           trigger_training_pipeline)
+from config import Config
 from flask import Flask, jsonify, request
+from profiles import load_profile
 from register import ServiceRegistrationHandler
 
 logging.basicConfig(
@@ -19,45 +24,108 @@ logger.info("Registered")
 @app.route("/api/v1/triggers/<target>", methods=["POST"])
 def train(target):
     try:
-        logger.info("Requesting data service information")
-        service_info = requests.get(
-            "http://service-discovery:8000/discover/dataservice"
-        ).json()
-        dataservice_ip = service_info.get("name")
-        dataservice_port = service_info.get("port")
-        logger.info(f"Request sent to: {dataservice_ip}:{dataservice_port}")
-        dataservice_url = (
-            f"http://{dataservice_ip}:{dataservice_port}/api/v1/{target}/full"
-        )
-
-        r = requests.get(dataservice_url)
-        logger.info(f"Data sevice response: {r.status_code}")
-        response_data = r.json()
-        data = response_data["data"]
-        latest_train_date = response_data["latestDate"]
-
-        task = trigger_training_pipeline.apply_async(args=[data, target])
+        incremental = request.args.get("incremental", "false").lower() == "true"
+        profile = (request.get_json(silent=True) or {}).get("profile")
+        try:
+            load_profile(target, Config().training_profiles_path, profile)
+        except (ValueError, TypeError) as e:
+            return jsonify({"error": f"Invalid profile: {e}"}), 400
+
+        # data is fetched and staged by the worker, never by the api. The fetch
+        # step reports its progress under the id of the training task
+        job_id = uuid()
+        task = chain(
+            fetch_training_data.s(target, job_id),
+            trigger_training_pipeline.s(target, incremental, profile).set(
+                task_id=job_id
+            ),
+        ).apply_async()
         logger.info("Task sent to queue")
-        
-        with open("date.txt", "w") as f:
-            f.write(latest_train_date)
-        
-        
+
         return jsonify({"taskId": task.id, "status": "Processing"})
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route("/api/v1/triggers", methods=["POST"])
+def train_many():
+    try:
+        data = request.json or {}
+        targets = data.get("targets")
+        if (
+            not isinstance(targets, list)
+            or not targets
+            or not all(isinstance(target, str) and target for target in targets)
+        ):
+            return (
+                jsonify({"error": "targets has to be a non-empty list of strings"}),
+                400,
+            )
+        targets = list(dict.fromkeys(targets))
+
+        cpu_budget = data.get("cpuBudget", Config().training_cpu_budget)
+        valid_budget = isinstance(cpu_budget, int) and not isinstance(cpu_budget, bool)
+        if not valid_budget or cpu_budget < 1:
+            return (
+                jsonify({"error": "cpuBudget has to be an integer of at least 1"}),
+                400,
+            )
+        incremental = data.get("incremental", False)
+        if not isinstance(incremental, bool):
+            return jsonify({"error": "incremental has to be a boolean"}), 400
+
+        # "profile" applies to every target, "profiles" to single targets
+        shared_profile = data.get("profile") or {}
+        target_profiles = data.get("profiles") or {}
+        if not isinstance(shared_profile, dict) or not isinstance(
+            target_profiles, dict
+        ):
+            return jsonify({"error": "profile and profiles have to be objects"}), 400
+        if not all(isinstance(profile, dict) for profile in target_profiles.values()):
+            return jsonify({"error": "profiles has to map targets to objects"}), 400
+        profiles = {
+            target: {**shared_profile, **target_profiles.get(target, {})}
+            for target in targets
+        }
+        try:
+            for target, profile in profiles.items():
+                load_profile(target, Config().training_profiles_path, profile)
+        except (ValueError, TypeError) as e:
+            return jsonify({"error": f"Invalid profile: {e}"}), 400
+
+        job_id = uuid()
+        task = chain(
+            fetch_training_data_many.s(targets, job_id),
+            trigger_multi_training_pipeline.s(cpu_budget, incremental, profiles).set(
+                task_id=job_id
+            ),
+        ).apply_async()
+        logger.info("Task sent to queue")
+
+        return jsonify({"taskId": task.id, "targets": targets, "status": "Processing"})
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route("/api/v1/results/<task_id>", methods=["GET"])
 def get_results(task_id):
     try:
         result = AsyncResult(task_id)
         logger.info(f"Task result received for {task_id}")
-        if result.ready():
+        if result.state == "FAILURE":
+            return jsonify(
+                {"taskId": task_id, "status": "Failed", "error": str(result.info)}
+            )
+        elif result.ready():
             return jsonify(
                 {"taskId": task_id, "status": "Completed", "result": result.get()}
             )
+        elif result.state == "PROGRESS":
+            return jsonify(
+                {"taskId": task_id, "status": "Processing", "progress": result.info}
+            )
         else:
             return jsonify({"taskId": task_id, "status": "Processing"})
     except Exception as e:
@@ -67,7 +135,7 @@ def get_results(task_id):
 @app.route("/api/v1/trainingdate", methods=["GET"])
 def return_trained_date():
     try:
-        with open("date.txt", "r") as f:
+        with open(Config().training_date_path, "r") as f:
             trained_date = f.read().strip()
             
         return jsonify({"trainedDate": trained_date}), 200 
@@ -0,0 +1,155 @@
+import inspect
+import logging
+from dataclasses import dataclass, field, fields, replace
+from typing import Optional
+
+import optuna
+import yaml
+from prophet import Prophet
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEARCH_SPACE = {
+    "changepoint_prior_scale": {"type": "float", "low": 0.005, "high": 5},
+    "changepoint_range": {"type": "float", "low": 0.8, "high": 0.9},
+    "seasonality_prior_scale": {"type": "float", "low": 0.1, "high": 10},
+    "holidays_prior_scale": {"type": "float", "low": 0.1, "high": 10},
+    "seasonality_mode": {
+        "type": "categorical",
+        "choices": ["multiplicative", "additive"],
+    },
+    "growth": {"type": "categorical", "choices": ["linear", "logistic"]},
+    "weekly_seasonality": {"type": "int", "low": 5, "high": 10},
+    "yearly_seasonality": {"type": "int", "low": 1, "high": 20},
+}
+
+SAMPLERS = {
+    "tpe": optuna.samplers.TPESampler,
+    "random": optuna.samplers.RandomSampler,
+    "qmc": optuna.samplers.QMCSampler,
+}
+
+# the trainer sets these on every model itself
+RESERVED_PARAMS = {"holidays", "uncertainty_samples"}
+
+
+@dataclass
+class TrainingProfile:
+    """How much search a target gets: trial and time budget, space, sampler, parallelism
+
+    n_jobs of None falls back to Config.optuna_n_jobs. timeout is the wall-clock
+    budget of the search in seconds and patience the number of trials without
+    improvement after which it stops, None disables either.
+    """
+
+    num_trials: int = 3
+    timeout: Optional[float] = None
+    patience: Optional[int] = None
+    n_jobs: Optional[int] = None
+    sampler: str = "tpe"
+    sampler_options: dict = field(default_factory=dict)
+    search_space: dict = field(default_factory=lambda: dict(DEFAULT_SEARCH_SPACE))
+    experiment_name: str = "best_experiments"
+
+    def __post_init__(self):
+        if self.sampler not in SAMPLERS:
+            raise ValueError(
+                f"Unknown sampler {self.sampler}, choose one of {', '.join(SAMPLERS)}"
+            )
+        if self.num_trials < 1:
+            raise ValueError("num_trials has to be at least 1")
+        if self.patience is not None and self.patience < 1:
+            raise ValueError("patience has to be at least 1")
+        if self.n_jobs is not None and self.n_jobs < 1:
+            raise ValueError("n_jobs has to be at least 1")
+        if self.timeout is not None and self.timeout <= 0:
+            raise ValueError("timeout has to be positive")
+        prophet_params = set(inspect.signature(Prophet).parameters) - RESERVED_PARAMS
+        for name, spec in self.search_space.items():
+            if name not in prophet_params:
+                raise ValueError(f"Parameter {name} is not a Prophet parameter")
+            _check_param_spec(name, spec)
+        try:
+            self.make_sampler()
+        except TypeError as e:
+            raise ValueError(f"Invalid sampler_options: {e}") from e
+
+    @classmethod
+    def from_dict(cls, values: dict) -> "TrainingProfile":
+        return cls().with_overrides(values)
+
+    def with_overrides(self, values: Optional[dict]) -> "TrainingProfile":
+        if not values:
+            return self
+        known = {f.name for f in fields(self)}
+        unknown = set(values) - known
+        if unknown:
+            raise ValueError(f"Unknown profile fields: {', '.join(sorted(unknown))}")
+
+        values = dict(values)
+        if "search_space" in values:
+            # a section only names the parameters it changes, null drops one
+            search_space = {**self.search_space, **(values["search_space"] or {})}
+            values["search_space"] = {
+                name: spec for name, spec in search_space.items() if spec is not None
+            }
+        return replace(self, **values)
+
+    def make_sampler(self, seed_offset: int = 0) -> optuna.samplers.BaseSampler:
+        """seed_offset keeps parallel workers from drawing the same points"""
+        options = dict(self.sampler_options)
+        if options.get("seed") is not None:
+            options["seed"] += seed_offset
+        return SAMPLERS[self.sampler](**options)
+
+    def suggest(self, trial: optuna.Trial) -> dict:
+        params = {}
+        for name, spec in self.search_space.items():
+            if spec["type"] == "categorical":
+                params[name] = trial.suggest_categorical(name, spec["choices"])
+            elif spec["type"] == "int":
+                params[name] = trial.suggest_int(
+                    name, spec["low"], spec["high"], log=spec.get("log", False)
+                )
+            else:
+                params[name] = trial.suggest_float(
+                    name, spec["low"], spec["high"], log=spec.get("log", False)
+                )
+        return params
+
+
+def _check_param_spec(name: str, spec: dict) -> None:
+    if not isinstance(spec, dict):
+        raise ValueError(f"Parameter {name} needs a mapping with a type")
+    kind = spec.get("type")
+    if kind == "categorical":
+        if not spec.get("choices"):
+            raise ValueError(f"Parameter {name} needs choices")
+    elif kind in ("int", "float"):
+        if "low" not in spec or "high" not in spec or spec["low"] > spec["high"]:
+            raise ValueError(f"Parameter {name} needs low <= high")
+    else:
+        raise ValueError(f"Parameter {name} has unknown type {kind}")
+
+
+def load_profile(
+    target: str, path: Optional[str] = None, overrides: Optional[dict] = None
+) -> TrainingProfile:
+    """Reads the profile of target from the YAML file at path
+
+    The file has a "default" section and per target sections under
+    "targets", both holding TrainingProfile fields. A target's section is
+    applied on top of the default, overrides (e.g. from a request body)
+    on top of both.
+    """
+    profiles = {}
+    if path is not None:
+        try:
+            with open(path) as f:
+                profiles = yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            logger.warning(f"No training profiles at {path}, using defaults")
+
+    profile = TrainingProfile.from_dict(profiles.get("default"))
+    profile = profile.with_overrides((profiles.get("targets") or {}).get(target))
+    return profile.with_overrides(overrides)
@@ -0,0 +1,49 @@
+import time
+from typing import Callable, Optional
+
+
+class ProgressReporter:
+    """Tracks the stages of a training run and publishes them with their timings
+
+    publish receives a dict with the current stage, the seconds spent in
+    every finished stage and whatever extra info the caller passes along.
+    """
+
+    def __init__(
+        self,
+        publish: Optional[Callable[[dict], None]] = None,
+        timings: Optional[dict] = None,
+    ) -> None:
+        self.publish = publish
+        self.timings = dict(timings or {})
+        self._stage = None
+        self._stage_started = None
+
+    def stage(self, name: str, **info) -> None:
+        self._close_stage()
+        self._stage = name
+        self._stage_started = time.monotonic()
+        self._emit(info)
+
+    def update(self, **info) -> None:
+        self._emit(info)
+
+    def finish(self) -> dict:
+        """Closes the current stage and publishes the final timings"""
+        self._close_stage()
+        self._stage = None
+        self._emit({})
+        return {"timings": dict(self.timings), "total": sum(self.timings.values())}
+
+    def _close_stage(self) -> None:
+        if self._stage is not None:
+            elapsed = time.monotonic() - self._stage_started
+            self.timings[self._stage] = self.timings.get(self._stage, 0.0) + elapsed
+
+    def _emit(self, info: dict) -> None:
+        if self.publish is None:
+            return
+        meta = {"stage": self._stage, "timings": dict(self.timings), **info}
+        if self._stage is not None:
+            meta["stageElapsed"] = time.monotonic() - self._stage_started
+        self.publish(meta)
@@ -0,0 +1,126 @@
+import hashlib
+import io
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import boto3
+import pandas as pd
+from botocore.exceptions import ClientError
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetStager:
+    """Stores prepared frames under their content hash
+
+    Only the returned reference travels through the broker. Local references
+    point into a volume shared by the api and the workers, s3 references
+    point into the MinIO bucket. Snapshots older than staging_retention
+    seconds are pruned whenever a new one is staged.
+    """
+
+    def __init__(self, config: Config) -> None:
+        self.staging_dir = config.staging_dir
+        self.bucket = config.staging_bucket
+        self.retention = config.staging_retention
+        self.config = config
+
+    def stage(self, df: pd.DataFrame) -> str:
+        digest = self._content_hash(df)
+        name = f"{digest}.parquet"
+        # pruned first, so an expired snapshot that is staged again gets rewritten
+        self.prune()
+
+        if self.bucket is None:
+            path = os.path.join(self.staging_dir, name)
+            if os.path.exists(path):
+                # restarts the retention of a snapshot that is about to be used again
+                os.utime(path)
+            else:
+                os.makedirs(self.staging_dir, exist_ok=True)
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                df.to_parquet(tmp_path, engine="pyarrow", compression=None, index=False)
+                os.replace(tmp_path, path)
+            return f"file://{path}"
+
+        key = f"staging/{name}"
+        client = self._s3_client()
+        if not self._s3_exists(client, key):
+            buffer = io.BytesIO()
+            df.to_parquet(buffer, engine="pyarrow", index=False)
+            client.put_object(Bucket=self.bucket, Key=key, Body=buffer.getvalue())
+        return f"s3://{self.bucket}/{key}"
+
+    def load(self, ref: str) -> pd.DataFrame:
+        if ref.startswith("file://"):
+            return pd.read_parquet(
+                ref[len("file://") :], engine="pyarrow", memory_map=True
+            )
+
+        if ref.startswith("s3://"):
+            bucket, key = ref[len("s3://") :].split("/", 1)
+            body = self._s3_client().get_object(Bucket=bucket, Key=key)["Body"].read()
+            return pd.read_parquet(io.BytesIO(body), engine="pyarrow")
+
+        raise ValueError(f"Unsupported dataset reference: {ref}")
+
+    def prune(self) -> None:
+        """Removes snapshots and leftover temporary files older than the retention"""
+        if self.bucket is None:
+            self._prune_local()
+        else:
+            self._prune_s3()
+
+    def _prune_local(self) -> None:
+        if not os.path.isdir(self.staging_dir):
+            return
+        # the directory also holds files that are not snapshots, e.g. the training date
+        expiry = time.time() - self.retention
+        for name in os.listdir(self.staging_dir):
+            if not name.endswith((".parquet", ".tmp")):
+                continue
+            path = os.path.join(self.staging_dir, name)
+            try:
+                if os.path.getmtime(path) < expiry:
+                    os.remove(path)
+                    logger.info(f"Pruned staged dataset {name}")
+            except FileNotFoundError:
+                pass
+
+    def _prune_s3(self) -> None:
+        client = self._s3_client()
+        expiry = datetime.now(timezone.utc) - timedelta(seconds=self.retention)
+        paginator = client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix="staging/"):
+            for obj in page.get("Contents", []):
+                if obj["LastModified"] < expiry:
+                    client.delete_object(Bucket=self.bucket, Key=obj["Key"])
+                    logger.info(f"Pruned staged dataset {obj['Key']}")
+
+    @staticmethod
+    def _content_hash(df: pd.DataFrame) -> str:
+        digest = hashlib.sha256()
+        digest.update(",".join(map(str, df.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+        return digest.hexdigest()
+
+    def _s3_client(self):
+        return boto3.client(
+            "s3",
+            endpoint_url=self.config.mlflow_s3_endpoint_url,
+            aws_access_key_id=self.config.aws_access_key_id,
+            aws_secret_access_key=self.config.aws_secret_access_key,
+            region_name=self.config.aws_region,
+        )
+
+    def _s3_exists(self, client, key: str) -> bool:
+        try:
+            client.head_object(Bucket=self.bucket, Key=key)
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
@@ -1,16 +1,35 @@
 import datetime
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
 from abc import ABC, abstractmethod
-from typing import Callable
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+from contextlib import closing
+from typing import Callable, Optional
 
 import mlflow
+import numpy as np
 import optuna
 import pandas as pd
+from compactmodel import save_compact_model
 from config import Config
+from evaluator import RollingOriginEvaluator, fold_metrics
 from optuna.integration.mlflow import MLflowCallback
+from optuna.trial import TrialState
 from prophet import Prophet
+from profiles import TrainingProfile
+from progress import ProgressReporter
+from prophet.make_holidays import make_holidays_df
 from sklearn.metrics import (mean_absolute_error,
                              mean_absolute_percentage_error,
                              mean_squared_error, r2_score)
+from trialstore import TrialModelStore
+from warmstart import WarmStartHandler, warm_start_params
+
+logger = logging.getLogger(__name__)
 
 
 class TrainingStrategy(ABC):
@@ -20,45 +39,119 @@ class TrainingStrategy(ABC):
 
 
 class AutoTrainingStrategy(TrainingStrategy):
+    # holidays are precomputed, so they have to cover the dates the model
+    # will later be asked to forecast as well
+    holiday_years_ahead = 10
+    # seconds between progress reports while pool processes run the search
+    progress_interval = 5
+
     def __init__(
         self,
         df: pd.DataFrame,
         registry_name: str,
         num_trials: int,
         best_model_experiment_name: str,
+        n_jobs: int = 1,
+        n_stages: int = 3,
+        warm_start_target: Optional[str] = None,
+        fold_jobs: int = 1,
+        profile: Optional[TrainingProfile] = None,
+        time_budget: Optional[float] = None,
+        patience: Optional[int] = None,
     ):
         self.df = df
         self.registry_name = registry_name
         self.num_trials = num_trials
         self.best_model_experiment_name = best_model_experiment_name
-        cfg = Config()
-        cfg.setup_environment()
+        self.n_jobs = n_jobs
+        self.n_stages = n_stages
+        self.warm_start_target = warm_start_target
+        self.fold_jobs = fold_jobs
+        self.profile = profile or TrainingProfile()
+        # the search stops after time_budget seconds or once patience trials
+        # in a row brought no improvement, keeping the best model found so far
+        self.time_budget = time_budget
+        self.patience = patience
+        self._deadline = None
+        self._previous_params = None
+        self._fit_kwargs = {}
+        self._trial_models = None
+        self.cfg = Config()
+        self.cfg.setup_environment()
+        self._prepare_study()
 
-    def train(self):
-        params = self._optimize_params(
-            study_name="auto_train",
-            num_trials=self.num_trials,
-            objective=self._objective,
-        )
+    def train(self, reporter: Optional[ProgressReporter] = None):
+        reporter = reporter or ProgressReporter()
+        if self.warm_start_target is not None:
+            self._load_warm_start()
+
+        trial_models_dir = None
+        if self.cfg.trial_model_capacity > 0:
+            os.makedirs(self.cfg.optuna_storage_dir, exist_ok=True)
+            trial_models_dir = tempfile.mkdtemp(dir=self.cfg.optuna_storage_dir)
+            self._trial_models = TrialModelStore(
+                trial_models_dir, self.cfg.trial_model_capacity
+            )
+
+        try:
+            reporter.stage("searching", trial=0, numTrials=self.num_trials)
+            best_trial, stop_reason = self._optimize_params(
+                study_name="auto_train",
+                num_trials=self.num_trials,
+                objective=self._objective,
+                reporter=reporter,
+            )
+            winner = None
+            if self._trial_models is not None:
+                winner = self._trial_models.load(best_trial.number)
+        finally:
+            self._trial_models = None
+            if trial_models_dir is not None:
+                shutil.rmtree(trial_models_dir, ignore_errors=True)
 
-        train_df, val_df, test_df = self._split_data()
+        params = best_trial.params
+        train_df, val_df, test_df = self._splits
         mlflow.set_experiment(experiment_name=self.best_model_experiment_name)
 
+        reporter.stage("final fit", bestValue=best_trial.value, stopReason=stop_reason)
         with mlflow.start_run():
-            m = Prophet(**params)
-            m.add_country_holidays(country_name="NL")
-            m.fit(train_df)
-            preds = m.predict(val_df[["ds", "cap", "floor"]])
+            mlflow.set_tags(
+                {"stop_reason": stop_reason, "best_trial": best_trial.number}
+            )
+            # the winning trial already fitted these params on train_df
+            if winner is None:
+                winner = self._new_model(params)
+                winner.fit(train_df, **self._fit_kwargs)
+            val_preds = winner.predict(val_df[["ds", "cap", "floor"]])
 
-            signature = mlflow.models.infer_signature(test_df["y"], preds["yhat"])
+            # single final fit on train + val, evaluated on the held out test split
+            m = self._new_model(params)
+            m.fit(pd.concat([train_df, val_df]), init=warm_start_params(winner))
+            preds = m.predict(test_df[["ds", "cap", "floor"]])
+
+            signature = mlflow.models.infer_signature(
+                test_df[["ds", "cap", "floor"]], preds["yhat"]
+            )
 
             mlflow.log_params(params)
+            # the prediction service reads the logistic bounds from here
+            mlflow.log_params(
+                {"cap": float(self.df["cap"].max()), "floor": float(self.df["floor"].min())}
+            )
+            mlflow.log_metrics(
+                {"val_mae": mean_absolute_error(val_df["y"], val_preds["yhat"])}
+            )
             mlflow.log_metrics({"mse": mean_squared_error(test_df["y"], preds["yhat"])})
             mlflow.log_metrics({"r2": r2_score(test_df["y"], preds["yhat"])})
             mlflow.log_metrics(
                 {"mape": mean_absolute_percentage_error(test_df["y"], preds["yhat"])}
             )
 
+            reporter.stage("registering", bestValue=best_trial.value)
+            # logged before registering, so every registered version has it
+            with tempfile.TemporaryDirectory() as artifact_dir:
+                save_compact_model(m, artifact_dir)
+                mlflow.log_artifacts(artifact_dir, artifact_path="inference")
             mlflow.prophet.log_model(
                 pr_model=m,
                 artifact_path=f"prophet-model-{datetime.datetime.now()}",
@@ -67,53 +160,176 @@ class AutoTrainingStrategy(TrainingStrategy):
             )
 
     def _optimize_params(
-        self, study_name: str, num_trials: int, objective: Callable
-    ) -> dict:
-        pruner = optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=5)
-        study = optuna.create_study(
-            study_name=study_name, direction="minimize", pruner=pruner
-        )
+        self,
+        study_name: str,
+        num_trials: int,
+        objective: Callable,
+        reporter: ProgressReporter,
+    ) -> tuple[optuna.trial.FrozenTrial, str]:
+        """Returns the best trial and why the search ended"""
+        n_workers = min(self.n_jobs, num_trials)
+        if self.time_budget is not None:
+            self._deadline = time.time() + self.time_budget
+        stopper = _EarlyStopping(self._deadline, self.patience)
+        if n_workers <= 1:
+            study = optuna.create_study(
+                study_name=study_name,
+                direction="minimize",
+                pruner=_make_pruner(),
+                sampler=self.profile.make_sampler(),
+            )
+            self._enqueue_previous_params(study)
+            mlflow_callback = MLflowCallback(
+                tracking_uri=mlflow.get_tracking_uri(), metric_name="rmse"
+            )
+            study.optimize(
+                objective,
+                n_trials=num_trials,
+                callbacks=[
+                    mlflow_callback,
+                    stopper,
+                    lambda study, _: _report_trials(reporter, study, num_trials),
+                ],
+            )
+            return study.best_trial, _finish_reason(study)
 
-        mlflow_callback = MLflowCallback(
-            tracking_uri=mlflow.get_tracking_uri(), metric_name="rmse"
-        )
-        study.optimize(
-            objective,
-            n_trials=num_trials,
-            callbacks=[mlflow_callback],
-        )
+        os.makedirs(self.cfg.optuna_storage_dir, exist_ok=True)
+        storage_dir = tempfile.mkdtemp(dir=self.cfg.optuna_storage_dir)
+        storage_path = os.path.join(storage_dir, "journal.log")
+        try:
+            study = optuna.create_study(
+                study_name=study_name,
+                direction="minimize",
+                storage=_journal_storage(storage_path),
+            )
+            self._enqueue_previous_params(study)
+            # the callback of every worker logs into this experiment
+            mlflow.set_experiment(experiment_name=study_name)
+
+            trials_per_worker = [
+                num_trials // n_workers + (i < num_trials % n_workers)
+                for i in range(n_workers)
+            ]
+            with ProcessPoolExecutor(
+                max_workers=n_workers, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        _run_trials,
+                        study_name,
+                        storage_path,
+                        objective,
+                        n_trials,
+                        mlflow.get_tracking_uri(),
+                        self.profile.make_sampler(seed_offset=i),
+                        stopper,
+                    )
+                    for i, n_trials in enumerate(trials_per_worker)
+                ]
+                # the pool processes cannot publish, so the parent polls the
+                # shared study instead
+                pending = futures
+                while pending:
+                    done, pending = wait(
+                        pending,
+                        timeout=self.progress_interval,
+                        return_when=FIRST_EXCEPTION,
+                    )
+                    _report_trials(reporter, study, num_trials)
+                    if any(future.exception() for future in done):
+                        break
+                for future in futures:
+                    future.result()
 
-        return study.best_trial.params
+            return study.best_trial, _finish_reason(study)
+        finally:
+            shutil.rmtree(storage_dir, ignore_errors=True)
 
     def _objective(self, trial: optuna.trial) -> float | int:
-        params = {
-            "changepoint_prior_scale": trial.suggest_float(
-                "changepoint_prior_scale", 0.005, 5
-            ),
-            "changepoint_range": trial.suggest_float("changepoint_range", 0.8, 0.9),
-            "seasonality_prior_scale": trial.suggest_float(
-                "seasonality_prior_scale", 0.1, 10
-            ),
-            "holidays_prior_scale": trial.suggest_float(
-                "holidays_prior_scale", 0.1, 10
-            ),
-            "seasonality_mode": trial.suggest_categorical(
-                "seasonality_mode", ["multiplicative", "additive"]
-            ),
-            "growth": trial.suggest_categorical("growth", ["linear", "logistic"]),
-            "weekly_seasonality": trial.suggest_int("weekly_seasonality", 5, 10),
-            "yearly_seasonality": trial.suggest_int("yearly_seasonality", 1, 20),
-        }
+        params = self.profile.suggest(trial)
+
+        # each fold reports the mean MAE so far. The early folds train on
+        # short windows, so the pruner stops hopeless configurations before
+        # the full train split is fitted. Trials only score yhat, uncertainty
+        # sampling would cost more than the fits themselves
+        yhats = []
+        folds = self._evaluator.iter_folds(
+            lambda: self._new_model(params, uncertainty_samples=0), **self._fit_kwargs
+        )
+        with closing(folds):
+            for step, m, yhat in folds:
+                yhats.append(yhat)
+                scores = fold_metrics(self._evaluator.y[: step + 1], np.stack(yhats))
+                mae_score = float(scores["mae"].mean())
+                trial.report(mae_score, step)
+                if trial.should_prune():
+                    raise optuna.TrialPruned()
+                # a trial that finished its folds keeps its score past the deadline
+                last_step = step == len(self._evaluator.folds) - 1
+                if not last_step and self._past_deadline(trial.study):
+                    raise optuna.TrialPruned()
+
+        trial.set_user_attr("cv_mse", float(scores["mse"].mean()))
+        trial.set_user_attr("cv_mape", float(scores["mape"].mean()))
 
-        train_df, val_df, test_df = self._split_data()
-        m = Prophet(**params)
-        m.add_country_holidays(country_name="NL")
-        m.fit(train_df)
-        preds = m.predict(val_df[["ds", "cap", "floor"]])
+        # the last fold is fitted on the full train split, keep it for the final stage
+        if self._trial_models is not None:
+            self._trial_models.save(trial.number, mae_score, m)
 
-        mae_score = mean_absolute_error(val_df["y"], preds["yhat"])
         return mae_score
 
+    def _past_deadline(self, study: optuna.Study) -> bool:
+        """Whether a trial should give up because the time budget ran out
+
+        The budget only binds once some trial has completed, so there is
+        always a model to register.
+        """
+        if self._deadline is None or time.time() < self._deadline:
+            return False
+        return bool(study.get_trials(deepcopy=False, states=(TrialState.COMPLETE,)))
+
+    def _load_warm_start(self) -> None:
+        """Seeds the search and every fit from the last registered model of the target"""
+        handler = WarmStartHandler(self.warm_start_target)
+        version = handler.latest_version()
+        if version is None:
+            logger.info(f"No registered model for {self.warm_start_target}, starting cold")
+            return
+
+        # runs also log params outside the search, e.g. cap and floor
+        self._previous_params = {
+            name: value
+            for name, value in handler.best_params(version).items()
+            if name in self.profile.search_space
+        }
+        self._fit_kwargs = {"init": handler.stan_init(version)}
+        logger.info(f"Warm starting from {version.name} version {version.version}")
+
+    def _enqueue_previous_params(self, study: optuna.Study) -> None:
+        if self._previous_params is not None:
+            study.enqueue_trial(self._previous_params, skip_if_exists=True)
+
+    def _prepare_study(self) -> None:
+        """Builds everything trials share once per study: splits, folds and holidays"""
+        self._splits = self._split_data()
+        train_df, val_df, _ = self._splits
+        self._evaluator = RollingOriginEvaluator(
+            pd.concat([train_df, val_df]),
+            n_folds=self.n_stages,
+            horizon=val_df.shape[0],
+            n_jobs=self.fold_jobs,
+            window=val_df.shape[0],
+        )
+
+        years = pd.to_datetime(self.df["ds"]).dt.year
+        last_year = years.max() + self.holiday_years_ahead
+        self._holidays = make_holidays_df(
+            year_list=list(range(years.min(), last_year + 1)), country="NL"
+        )
+
+    def _new_model(self, params: dict, **options) -> Prophet:
+        return Prophet(**params, holidays=self._holidays, **options)
+
     def _split_data(self):
         test_size = int(self.df.shape[0] / 10)
         train_df = self.df.iloc[: -2 * test_size, :]
@@ -123,6 +339,96 @@ class AutoTrainingStrategy(TrainingStrategy):
         return train_df, val_df, test_df
 
 
+def _make_pruner() -> optuna.pruners.BasePruner:
+    return optuna.pruners.MedianPruner(n_startup_trials=2, n_warmup_steps=0)
+
+
+class _EarlyStopping:
+    """Optuna callback stopping a search on its deadline or when it stagnates
+
+    The reason is stored on the study, so with a shared storage every
+    worker stops and the parent can read why.
+    """
+
+    def __init__(self, deadline: Optional[float], patience: Optional[int]) -> None:
+        self.deadline = deadline
+        self.patience = patience
+
+    def __call__(self, study: optuna.Study, trial: optuna.trial.FrozenTrial) -> None:
+        reason = self.stop_reason(study)
+        if reason is not None:
+            if "stop_reason" not in study.user_attrs:
+                study.set_user_attr("stop_reason", reason)
+            study.stop()
+
+    def stop_reason(self, study: optuna.Study) -> Optional[str]:
+        if "stop_reason" in study.user_attrs:
+            return study.user_attrs["stop_reason"]
+
+        finished = study.get_trials(
+            deepcopy=False, states=(TrialState.COMPLETE, TrialState.PRUNED)
+        )
+        complete = [t for t in finished if t.state == TrialState.COMPLETE]
+        if not complete:
+            return None
+
+        if self.deadline is not None and time.time() >= self.deadline:
+            return "time budget exhausted"
+        if self.patience is not None:
+            best = min(complete, key=lambda t: t.value)
+            if sum(t.number > best.number for t in finished) >= self.patience:
+                return f"no improvement in {self.patience} trials"
+        return None
+
+
+def _finish_reason(study: optuna.Study) -> str:
+    return study.user_attrs.get("stop_reason", "trial budget exhausted")
+
+
+def _report_trials(
+    reporter: ProgressReporter, study: optuna.Study, num_trials: int
+) -> None:
+    finished = study.get_trials(
+        deepcopy=False,
+        states=(TrialState.COMPLETE, TrialState.PRUNED, TrialState.FAIL),
+    )
+    scores = [t.value for t in finished if t.state == TrialState.COMPLETE]
+    reporter.update(
+        trial=len(finished),
+        numTrials=num_trials,
+        pruned=sum(t.state == TrialState.PRUNED for t in finished),
+        bestValue=min(scores) if scores else None,
+    )
+
+
+def _journal_storage(storage_path: str) -> optuna.storages.JournalStorage:
+    return optuna.storages.JournalStorage(
+        optuna.storages.JournalFileStorage(storage_path)
+    )
+
+
+def _run_trials(
+    study_name: str,
+    storage_path: str,
+    objective: Callable,
+    n_trials: int,
+    tracking_uri: str,
+    sampler: optuna.samplers.BaseSampler,
+    stopper: Callable,
+) -> None:
+    """Runs part of a parallel search in a pool process against the shared study"""
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=_journal_storage(storage_path),
+        pruner=_make_pruner(),
+        sampler=sampler,
+    )
+    mlflow_callback = MLflowCallback(tracking_uri=tracking_uri, metric_name="rmse")
+    study.optimize(
+        objective, n_trials=n_trials, callbacks=[mlflow_callback, stopper]
+    )
+
+
 class ManualTrainingStrategy(TrainingStrategy):
     def __init__(self, df: pd.DataFrame):
         self.df = df
@@ -171,14 +477,46 @@ class TrainingStrategyBuilder:
         self.registry_name = None
         self.num_trials = None
         self.best_model_experiment_name = None
+        self.n_jobs = 1
+        self.n_stages = 3
+        self.warm_start_target = None
+        self.fold_jobs = 1
+        self.profile = None
+        self.time_budget = None
+        self.patience = None
         self.manual_training_params = None
 
     def set_auto_training_params(
-        self, registry_name: str, num_trials: int, best_model_experiment_name: str
+        self,
+        registry_name: str,
+        num_trials: int,
+        best_model_experiment_name: str,
+        n_jobs: int = 1,
+        n_stages: int = 3,
+        fold_jobs: int = 1,
     ):
         self.registry_name = registry_name
         self.num_trials = num_trials
         self.best_model_experiment_name = best_model_experiment_name
+        self.n_jobs = n_jobs
+        self.n_stages = n_stages
+        self.fold_jobs = fold_jobs
+        return self
+
+    def set_profile(self, profile: TrainingProfile):
+        """Takes search space, sampler and time budget from profile"""
+        self.profile = profile
+        return self
+
+    def set_stopping(
+        self, time_budget: Optional[float] = None, patience: Optional[int] = None
+    ):
+        self.time_budget = time_budget
+        self.patience = patience
+        return self
+
+    def set_warm_start(self, target: str):
+        self.warm_start_target = target
         return self
 
     def set_manual_training_params(
@@ -208,6 +546,13 @@ class TrainingStrategyBuilder:
             self.registry_name,
             self.num_trials,
             self.best_model_experiment_name,
+            self.n_jobs,
+            self.n_stages,
+            self.warm_start_target,
+            self.fold_jobs,
+            self.profile,
+            self.time_budget,
+            self.patience,
         )
 
     def build_manual_trainer(self):
@@ -0,0 +1,60 @@
+import math
+import os
+from typing import Optional
+
+from prophet import Prophet
+from prophet.serialize import model_from_json, model_to_json
+
+
+class TrialModelStore:
+    """Keeps the fitted models of the best trials on disk, at most capacity of them
+
+    Files are shared through the filesystem so trials running in other
+    processes of a parallel search can store their models as well.
+    """
+
+    def __init__(self, directory: str, capacity: int) -> None:
+        self.directory = directory
+        self.capacity = capacity
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, trial_number: int, score: float, model: Prophet) -> None:
+        if not math.isfinite(score):
+            return
+
+        entries = self._entries()
+        if len(entries) >= self.capacity and score >= entries[-1][0]:
+            return
+
+        path = os.path.join(self.directory, f"{trial_number}_{score!r}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(model_to_json(model))
+        os.replace(tmp_path, path)
+
+        for _, _, stale_path in self._entries()[self.capacity :]:
+            try:
+                os.remove(stale_path)
+            except FileNotFoundError:
+                pass
+
+    def load(self, trial_number: int) -> Optional[Prophet]:
+        for _, number, path in self._entries():
+            if number == trial_number:
+                try:
+                    with open(path, "r") as f:
+                        return model_from_json(f.read())
+                except FileNotFoundError:
+                    return None
+        return None
+
+    def _entries(self) -> list:
+        """Returns (score, trial_number, path) sorted from best to worst"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            number, score = name[: -len(".json")].split("_", 1)
+            path = os.path.join(self.directory, name)
+            entries.append((float(score), int(number), path))
+        return sorted(entries)
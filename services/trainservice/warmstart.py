@@ -0,0 +1,66 @@
+from typing import Optional
+
+import mlflow
+import mlflow.prophet
+import numpy as np
+from mlflow import MlflowClient
+from mlflow.entities.model_registry import ModelVersion
+from prophet import Prophet
+
+
+class WarmStartHandler:
+    """Seeds a retraining run from the last registered model of a target
+
+    Registry names are <target>-<date>, so the previous model of a target is
+    the newest version across every registered name with that prefix.
+    """
+
+    def __init__(self, target: str, client: Optional[MlflowClient] = None) -> None:
+        self.target = target
+        self.client = client or MlflowClient()
+
+    def latest_version(self) -> Optional[ModelVersion]:
+        versions = self.client.search_model_versions(
+            f"name LIKE '{self.target}-%'",
+            max_results=1,
+            order_by=["creation_timestamp DESC"],
+        )
+        return versions[0] if versions else None
+
+    def best_params(self, version: ModelVersion) -> dict:
+        """Returns the hyperparameters logged with the version, with their types restored"""
+        run = self.client.get_run(version.run_id)
+        return {name: _parse_param(value) for name, value in run.data.params.items()}
+
+    def stan_init(self, version: ModelVersion) -> dict:
+        model = mlflow.prophet.load_model(f"models:/{version.name}/{version.version}")
+        return warm_start_params(model)
+
+
+def warm_start_params(model: Prophet) -> dict:
+    """Initial Stan values from a fitted model
+
+    Prophet falls back to its defaults for delta and beta when their shapes
+    do not match the new model, so these are safe to pass to any fit.
+    """
+    params = {}
+    for name in ["k", "m", "sigma_obs"]:
+        if model.mcmc_samples == 0:
+            params[name] = model.params[name][0][0]
+        else:
+            params[name] = np.mean(model.params[name])
+    for name in ["delta", "beta"]:
+        if model.mcmc_samples == 0:
+            params[name] = model.params[name][0]
+        else:
+            params[name] = np.mean(model.params[name], axis=0)
+    return params
+
+
+def _parse_param(value: str):
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value